@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import threading
 from typing import Annotated, Optional
 from dotenv import load_dotenv
 
@@ -14,8 +16,8 @@ from livekit.agents import (
     RoomInputOptions,
 )
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
-from merchant import MerchantAPI
+from livekit.plugins.turn_detector.english import EnglishModel
+from merchant import MerchantAPI, flush_writes
 
 load_dotenv(".env.local")
 logger = logging.getLogger("agent")
@@ -23,30 +25,21 @@ logger = logging.getLogger("agent")
 # Initialize the Merchant System
 merchant = MerchantAPI()
 
+# Silero VAD is stateless across sessions, so one loaded model is shared
+_VAD_SINGLETON = None
+_VAD_LOCK = threading.Lock()
+
 class CommerceAgent(Agent):
     def __init__(self):
         super().__init__(
-            instructions="""You are 'ShopBot', an AI Shopping Assistant powered by the Agentic Commerce Protocol.
-            
-            YOUR JOB:
-            Help users browse the catalog, find deals, and place orders.
-            
-            CAPABILITIES:
-            1. Browse: Use `search_catalog` to find items.
-               - If a user asks for "hoodies", search for "hoodie".
-               - If they ask for "electronics", use category="electronics".
-               - Always call the search_catalog function when users ask about products.
-            
-            2. Buy: Use `place_order` when the user confirms a purchase.
-               - Ask for the quantity if not specified.
-               - Ask for their name if you don't know it.
-            
-            3. History: Use `check_last_order` if they ask "What did I buy?".
-            
-            IMPORTANT: Always use the tools/functions available to you. Don't just talk about products - actually search for them.
-            
-            TONE: Efficient, polite, and transactional.
-            """,
+            instructions=(
+                "You are ShopBot, a shopping assistant. Help users browse the catalog, find deals, and place orders. "
+                "Always call search_catalog when users ask about products; use singular keywords "
+                "(\"hoodie\" not \"hoodies\") and category for broad asks like \"electronics\". "
+                "Call place_order once the user confirms, asking for quantity and their name if unknown. "
+                "Use check_last_order for \"What did I buy?\". "
+                "Be efficient, polite, and transactional."
+            ),
         )
 
     # --- TOOL 1: BROWSE ---
@@ -71,13 +64,13 @@ class CommerceAgent(Agent):
         if not results:
             return "No products found matching those criteria."
         
-        summary = "Found these items:\n"
+        lines = ["Found these items:"]
         for p in results:
             attrs = p.get('attributes', {})
-            attr_str = ", ".join([f"{k}: {v}" for k,v in attrs.items()])
-            summary += f"- {p['name']} (${p['price']}) [{attr_str}]\n"
+            attr_str = ", ".join(f"{k}: {v}" for k, v in attrs.items())
+            lines.append(f"- {p['name']} (${p['price']}) [{attr_str}]")
             
-        return summary
+        return "\n".join(lines)
 
     # --- TOOL 2: BUY ---
     @function_tool
@@ -90,6 +83,7 @@ class CommerceAgent(Agent):
         """Places an order and saves it to the backend."""
         logger.info(f"🛒 Ordering: {quantity}x {product_name} for {customer_name}")
         
+        # The order is persisted by MerchantAPI's background writer, so this doesn't block the loop
         result = merchant.create_order(product_name, quantity, customer_name)
         
         if "error" in result:
@@ -101,7 +95,8 @@ class CommerceAgent(Agent):
     @function_tool
     async def check_last_order(self):
         """Retrieves the details of the last order placed."""
-        order = merchant.get_last_order()
+        # May re-read the tail of the orders log, so keep it off the event loop
+        order = await asyncio.to_thread(merchant.get_last_order)
         if not order:
             return "You haven't placed any orders yet."
             
@@ -109,22 +104,29 @@ class CommerceAgent(Agent):
         return f"Your last order was for {item['quantity']}x {item['name']} on {order['timestamp']}. Total: ${order['total_amount']}."
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    global _VAD_SINGLETON
+    with _VAD_LOCK:
+        if _VAD_SINGLETON is None:
+            _VAD_SINGLETON = silero.VAD.load()
+    proc.userdata["vad"] = _VAD_SINGLETON
 
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {"room": ctx.room.name}
+    # Job processes exit via os._exit(), skipping atexit, so drain queued orders here
+    ctx.add_shutdown_callback(lambda: asyncio.to_thread(flush_writes))
 
     session = AgentSession(
         vad=ctx.proc.userdata["vad"],
-        stt=deepgram.STT(model="nova-3"),
+        stt=deepgram.STT(model="nova-3", endpointing_ms=25, interim_results=True),
         llm=google.LLM(model="gemini-2.5-flash"),  # Using latest Gemini model
         tts=murf.TTS(
             voice="en-US-terrell",
             style="Promo",
-            tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+            tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=10),
             text_pacing=True
         ),
-        turn_detection=MultilingualModel(),
+        turn_detection=EnglishModel(),
+        preemptive_generation=True,
     )
 
     await session.start(
@@ -1,76 +1,206 @@
-import json
+import atexit
+import logging
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from bisect import bisect_right
+
+import orjson
+
+logger = logging.getLogger("merchant")
+
+# Order lines are appended by a single background thread so tool calls never
+# wait on disk; one writer also keeps appends in submission order.
+_write_q = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+# Bytes read per step when looking for the last line of the orders log
+_TAIL_BLOCK = 4096
+
+
+def _drain_writes():
+    while True:
+        path, data = _write_q.get()
+        try:
+            with open(path, "ab") as f:
+                f.write(data)
+        except OSError:
+            # The caller has already confirmed this order, so make the loss loud
+            logger.exception(f"❌ Failed to persist order line to {path}: {data!r}")
+        finally:
+            _write_q.task_done()
+
+
+def _enqueue_write(path, data):
+    global _writer_thread
+    with _writer_lock:
+        # Started lazily so a forked worker gets its own thread
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_drain_writes, name="merchant-writer", daemon=True)
+            _writer_thread.start()
+    _write_q.put((path, data))
+
+
+def flush_writes():
+    """Blocks until every queued order has been written to disk."""
+    if _writer_thread is not None and _writer_thread.is_alive():
+        _write_q.join()
+
+
+# Only covers plain interpreter exits; livekit job processes end via os._exit(),
+# so agent.py also flushes from the job's shutdown callback.
+atexit.register(flush_writes)
+
+# path -> (mtime_ns, parsed catalog); instances share the list read-only and
+# an edited products.json is parsed again on the next load
+_CATALOG_CACHE = {}
+
 
 class MerchantAPI:
     def __init__(self):
         # Smart Path Finding (Fixes the "File Not Found" errors from previous days)
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.catalog_path = os.path.join(base_dir, "products.json")
-        self.orders_path = os.path.join(base_dir, "orders.json")
+        self.orders_path = os.path.join(base_dir, "orders.jsonl")
         self.products = self._load_catalog()
+        # Lowercased once at load so lookups don't re-lower every product per call
+        self._names_lower = tuple(p['name'].lower() for p in self.products)
+        self._build_search_index()
+        # Only the newest order is ever read back, so keep it in memory; other
+        # worker processes append to the same log, so the cache is tied to the
+        # file's (size, mtime) and reloaded when they change
+        self._orders_sig = self._orders_signature()
+        self._last_order = self._load_last_order()
 
     def _load_catalog(self):
         try:
-            with open(self.catalog_path, "r") as f:
-                return json.load(f)
+            mtime_ns = os.stat(self.catalog_path).st_mtime_ns
+            cached = _CATALOG_CACHE.get(self.catalog_path)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+            with open(self.catalog_path, "rb") as f:
+                products = orjson.loads(f.read())
+            _CATALOG_CACHE[self.catalog_path] = (mtime_ns, products)
+            return products
         except FileNotFoundError:
             print("❌ Error: products.json not found.")
             return []
 
+    def _build_search_index(self):
+        """Precomputes bitmasks so a search is a few integer ANDs, not a rescan."""
+        # Bit i of every mask stands for self.products[i]
+        self._all_bits = (1 << len(self.products)) - 1
+        # token -> products whose name, category or attribute values contain it
+        self._term_bits = {}
+        # lowercased category -> products in that category
+        self._cat_bits = {}
+        # name token -> products whose name contains it, for order lookups
+        self._name_bits = {}
+        for i, p in enumerate(self.products):
+            bit = 1 << i
+            for token in self._names_lower[i].split():
+                self._name_bits[token] = self._name_bits.get(token, 0) | bit
+            searchable_text = " ".join(
+                [p['name'], p['category']] + [str(v) for v in p.get('attributes', {}).values()]
+            ).lower()
+            for token in searchable_text.split():
+                self._term_bits[token] = self._term_bits.get(token, 0) | bit
+            cat = p['category'].lower()
+            self._cat_bits[cat] = self._cat_bits.get(cat, 0) | bit
+        # Prices in ascending order; _price_prefix[k] is the mask of the k cheapest
+        order = sorted(range(len(self.products)), key=lambda i: self.products[i]['price'])
+        self._sorted_prices = [self.products[i]['price'] for i in order]
+        self._price_prefix = [0]
+        for i in order:
+            self._price_prefix.append(self._price_prefix[-1] | (1 << i))
+
+    @staticmethod
+    def _bits_containing(term, bits_by_token):
+        """OR of the masks of every token that contains `term`."""
+        # Terms never contain whitespace, so "term in text" holds exactly when
+        # some token contains it; scanning the vocabulary keeps partial words
+        # like "hood" matching "hoodie".
+        mask = 0
+        for token, bits in bits_by_token.items():
+            if term in token:
+                mask |= bits
+        return mask
+
     def search_products(self, query=None, category=None, max_price=None):
         """Filters products based on criteria with smarter keyword matching."""
-        results = self.products
+        mask = self._all_bits
         
         # 1. Filter by Category
         if category:
-            results = [p for p in results if category.lower() in p['category'].lower()]
+            cat = category.lower()
+            cat_mask = 0
+            for name, bits in self._cat_bits.items():
+                if cat in name:
+                    cat_mask |= bits
+            mask &= cat_mask
         
         # 2. Filter by Price
         if max_price:
             try:
                 # Handle if AI passes "$100" or "100"
                 price_val = float(str(max_price).replace('$', '').replace(',', ''))
-                results = [p for p in results if p['price'] <= price_val]
+                # NaN would sort past every price but matches none of them
+                k = bisect_right(self._sorted_prices, price_val) if price_val == price_val else 0
+                mask &= self._price_prefix[k]
             except ValueError:
                 pass # Ignore invalid price filters
             
         # 3. Smart Keyword Search (The Fix!)
         if query:
-            q_terms = query.lower().split() # Split "black hoodie" -> ["black", "hoodie"]
-            filtered = []
-            
-            for p in results:
-                # Create a "Searchable Text" blob for this product
-                # It includes Name, Category, and all Attributes values
-                # e.g. "developer hoodie clothing black cotton..."
-                searchable_text = (
-                    p['name'].lower() + " " + 
-                    p['category'].lower() + " " + 
-                    " ".join(str(v).lower() for v in p.get('attributes', {}).values())
-                )
-                
-                # Check if ALL query words exist in the product data
-                # If user says "Black Hoodie", both "black" and "hoodie" must be in the text
-                if all(term in searchable_text for term in q_terms):
-                    filtered.append(p)
-            
-            results = filtered
+            # Split "black hoodie" -> ["black", "hoodie"]; ALL words must appear
+            # somewhere in the product's name, category or attribute values
+            for term in query.lower().split():
+                if not mask:
+                    break
+                mask &= self._bits_containing(term, self._term_bits)
             
+        # Walk the set bits lowest-first so results keep catalog order
+        results = []
+        while mask:
+            low = mask & -mask
+            results.append(self.products[low.bit_length() - 1])
+            mask ^= low
         return results
+
+    def _find_product(self, product_name):
+        """First catalog product whose name contains `product_name` (case-insensitive)."""
+        needle = product_name.lower()
+        # Any name containing the needle contains each of its words, so the
+        # name-token masks narrow the candidates before the substring check
+        mask = self._all_bits
+        for term in needle.split():
+            mask &= self._bits_containing(term, self._name_bits)
+            if not mask:
+                return None
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            if needle in self._names_lower[i]:
+                return self.products[i]
+            mask ^= low
+        return None
+
     def create_order(self, product_name, quantity, customer_name):
         """Creates an order object and saves it."""
         # 1. Find the product
-        product = next((p for p in self.products if product_name.lower() in p['name'].lower()), None)
+        product = self._find_product(product_name)
         
         if not product:
             return {"error": f"Product '{product_name}' not found."}
 
         # 2. Construct Order Object (ACP Style)
         total_price = product['price'] * quantity
+        now = time.time_ns() // 1_000_000_000  # whole seconds, no float round-trip
         order = {
-            "order_id": f"ORD-{int(datetime.now().timestamp())}",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "order_id": f"ORD-{now}",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
             "customer": customer_name,
             "items": [
                 {
@@ -85,28 +215,42 @@ class MerchantAPI:
             "status": "confirmed"
         }
 
-        # 3. Persist to JSON
-        existing_orders = []
-        if os.path.exists(self.orders_path):
-            try:
-                with open(self.orders_path, "r") as f:
-                    existing_orders = json.load(f)
-            except: pass
-            
-        existing_orders.append(order)
-        
-        with open(self.orders_path, "w") as f:
-            json.dump(existing_orders, f, indent=2)
+        # 3. Persist as one JSON line (append-only, written in the background)
+        _enqueue_write(self.orders_path, orjson.dumps(order) + b"\n")
+        self._last_order = order
             
         return order
 
     def get_last_order(self):
         """Retrieves the most recent order."""
+        sig = self._orders_signature()
+        if sig != self._orders_sig:
+            self._orders_sig = sig
+            self._last_order = self._load_last_order()
+        return self._last_order
+
+    def _orders_signature(self):
+        try:
+            st = os.stat(self.orders_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _load_last_order(self):
+        """Reads just the final line of the orders log, without scanning it."""
         if not os.path.exists(self.orders_path):
             return None
         try:
-            with open(self.orders_path, "r") as f:
-                orders = json.load(f)
-                return orders[-1] if orders else None
+            with open(self.orders_path, "rb") as f:
+                # Read backwards in blocks until a full last line is in view
+                pos = f.seek(0, os.SEEK_END)
+                tail = b""
+                while pos > 0 and tail.rstrip(b"\n").count(b"\n") == 0:
+                    step = min(_TAIL_BLOCK, pos)
+                    pos -= step
+                    f.seek(pos)
+                    tail = f.read(step) + tail
+            last = tail.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            return orjson.loads(last) if last else None
         except:
             return None
\ No newline at end of file
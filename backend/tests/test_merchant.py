@@ -0,0 +1,87 @@
+import pytest
+
+from merchant import MerchantAPI, flush_writes
+
+
+@pytest.fixture(scope="module")
+def merchant() -> MerchantAPI:
+    return MerchantAPI()
+
+
+def _ids(products: list[dict]) -> list[str]:
+    return [p["id"] for p in products]
+
+
+def test_search_requires_all_query_words(merchant: MerchantAPI) -> None:
+    """Every query word must appear in the product's name, category or attributes."""
+    assert _ids(merchant.search_products("black hoodie")) == ["prod_003"]
+
+
+def test_search_matches_partial_words(merchant: MerchantAPI) -> None:
+    """Query words match inside longer words, in catalog order."""
+    assert _ids(merchant.search_products("hood")) == [
+        "prod_003",
+        "prod_004",
+        "prod_009",
+    ]
+
+
+def test_search_combines_category_and_price(merchant: MerchantAPI) -> None:
+    """Category and price filters apply together, and "$50" is parsed as 50."""
+    results = merchant.search_products("", "electronics", "$50")
+    assert _ids(results) == ["prod_002", "prod_006", "prod_010"]
+
+
+def test_search_ignores_invalid_price(merchant: MerchantAPI) -> None:
+    """An unparseable max_price is ignored rather than filtering everything out."""
+    assert merchant.search_products("mug", None, "cheap") == merchant.search_products(
+        "mug"
+    )
+
+
+def test_search_without_matches_is_empty(merchant: MerchantAPI) -> None:
+    """Unknown words return no products."""
+    assert merchant.search_products("spaceship") == []
+
+
+def test_create_order_matches_partial_name(tmp_path) -> None:
+    """Orders resolve to the first catalog product whose name contains the text."""
+    api = MerchantAPI()
+    api.orders_path = str(tmp_path / "orders.jsonl")
+
+    order = api.create_order("gaming MOUSE", 2, "Rahul")
+    flush_writes()
+
+    assert order["items"][0]["product_id"] == "prod_002"
+    assert order["total_amount"] == pytest.approx(99.98)
+    assert api.get_last_order() == order
+    reloaded = MerchantAPI()
+    reloaded.orders_path = api.orders_path
+    assert reloaded._load_last_order() == order
+
+
+def test_create_order_unknown_product(tmp_path) -> None:
+    """Unknown products return an error and are not persisted."""
+    api = MerchantAPI()
+    api.orders_path = str(tmp_path / "orders.jsonl")
+
+    result = api.create_order("spaceship", 1, "Rahul")
+    flush_writes()
+
+    assert "error" in result
+    assert not (tmp_path / "orders.jsonl").exists()
+
+
+def test_last_order_sees_orders_from_other_instances(tmp_path) -> None:
+    """An order placed through one MerchantAPI is visible to another on the same log."""
+    orders_path = str(tmp_path / "orders.jsonl")
+    placer = MerchantAPI()
+    placer.orders_path = orders_path
+    reader = MerchantAPI()
+    reader.orders_path = orders_path
+    assert reader.get_last_order() is None
+
+    order = placer.create_order("numpad", 1, "Aaron")
+    flush_writes()
+
+    assert reader.get_last_order() == order